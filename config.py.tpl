@@ -1,4 +1,6 @@
-slack_cfg = {
+from typing import Any
+
+slack_cfg: dict[str, Any] = {
     "slack_webhook":{
         "url": "XXXXXXXXX",
         "channel": "XXXXXXXX"
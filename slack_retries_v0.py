@@ -1,16 +1,24 @@
 
-import json
-import requests
+import asyncio
+import httpx
+import orjson
 from config import slack_cfg
 import logging
-import time
-import logging
 import sys
 
 # Setting up the logger to use on the retry config
 logging.basicConfig(format='%(asctime)s :: %(levelname)s :: %(message)s',
-                    stream=sys.stderr, level=logging.DEBUG)
+                    stream=sys.stderr, level=logging.INFO)
 logger = logging.getLogger(__name__)
+# httpx logs every request at INFO, keep only its warnings
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Shared HTTP/2 client, reused across calls and retries;
+# concurrent posts share one connection
+_CLIENT = httpx.AsyncClient(http2=True, timeout=10)
+
+# Shared headers, httpx copies them into each request
+_JSON_HEADERS = {'Content-Type': 'application/json'}
 
 ## Prepare the slack message
 msg = dict(
@@ -22,53 +30,49 @@ msg = dict(
 TOTAL_ATTEMPS = 4
 SLEEP = 1
 
-def send_msg_slack(web_hook_url, channel, msg):
+async def send_msg_slack(web_hook_url, channel, msg):
+    # Serialize once, retries only resend the bytes
+    payload = orjson.dumps({**msg, "channel": f"#{channel}"})
     attemp = 1
     while attemp <= TOTAL_ATTEMPS:
-        logger.debug("Message attepmt: {attemp}".format(attemp=attemp))
-        msg["channel"] = "#{channel}".format(channel=channel)
-        msg_rq = requests.post(url=web_hook_url, json=msg, headers={
-            'Content-Type': 'application/json'})
-        response = msg_rq.text
+        msg_rq = await _CLIENT.post(url=web_hook_url, content=payload, headers=_JSON_HEADERS)
         try:
             msg_rq.raise_for_status()
         except:
+            # Only failed attempts are logged, formatted lazily by logging
+            logger.info("Message attempt %s failed", attemp)
             attemp += 1
-            time.sleep(SLEEP)
+            # Non blocking sleep, other posts keep running meanwhile
+            await asyncio.sleep(SLEEP)
         else:
-            return response
+            # Body is only decoded once the status says it is used
+            return msg_rq.text
     # All retries failed
     # Raise last error
     msg_rq.raise_for_status()
 
 
-# Test the webhook
-print("\nTesting Webhook")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = slack_cfg['slack_webhook']['channel']
-
-response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-print(response)
-
-# Force failure using a non-existing channel
-print("\nForce failure using a non-existing channel")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = "#NA"
+# Test cases: (title, webhook url, channel)
+test_cases = [
+    ("Testing Webhook", slack_cfg['slack_webhook']['url'], slack_cfg['slack_webhook']['channel']),
+    ("Force failure using a non-existing channel", slack_cfg['slack_webhook']['url'], "#NA"),
+    ("Force failure erro 5XX mock", slack_cfg['slack_mock5XX'], "#NA"),
+]
 
-try:
-    response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-    print(response)
-except Exception as err:
-    print(str(err))
 
+async def main():
+    try:
+        # Send all the test cases at once, a retry backoff on one
+        # of them does not hold the others
+        results = await asyncio.gather(
+            *(send_msg_slack(web_hook_url, web_hook_ch, msg)
+              for _, web_hook_url, web_hook_ch in test_cases),
+            return_exceptions=True)
+    finally:
+        await _CLIENT.aclose()
+    for (title, _, _), response in zip(test_cases, results):
+        print("\n" + title)
+        print(str(response))
 
-# Run test mocking error 500
-print("\nForce failure erro 5XX mock")
-web_hook_url = slack_cfg['slack_mock5XX']
-web_hook_ch = "#NA"
 
-try:
-    response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-    print(response)
-except Exception as err:
-    print(str(err))
+asyncio.run(main())
@@ -1,14 +1,24 @@
 
-import json
-import requests
+import asyncio
+import httpx
+import orjson
 from config import slack_cfg
-from tenacity import retry, stop_after_attempt, before_log, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, before_sleep_log, wait_exponential, retry_if_exception_type
 import logging
 import sys
 
 logging.basicConfig(format='%(asctime)s :: %(levelname)s :: %(message)s',
-                    stream=sys.stderr, level=logging.DEBUG)
+                    stream=sys.stderr, level=logging.INFO)
 logger = logging.getLogger(__name__)
+# httpx logs every request at INFO, keep only its warnings
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Shared HTTP/2 client, reused across calls and retries;
+# concurrent posts share one connection
+_CLIENT = httpx.AsyncClient(http2=True, timeout=10)
+
+# Shared headers, httpx copies them into each request
+_JSON_HEADERS = {'Content-Type': 'application/json'}
 
 
 class SendMsgError(Exception):
@@ -21,64 +31,54 @@ msg = dict(
     text="This is a simple text"
 )
 
-@retry(stop=stop_after_attempt(4), before=before_log(logger, logging.DEBUG),
+@retry(stop=stop_after_attempt(4), before_sleep=before_sleep_log(logger, logging.INFO),
        wait=wait_exponential(multiplier=1, min=0, max=10),
        retry=retry_if_exception_type(SendMsgError))
-def send_msg_slack(web_hook_url, channel, msg):
-    msg["channel"] = "#{channel}".format(channel=channel)
-    msg_rq = requests.post(url=web_hook_url, json=msg, headers={
-        'Content-Type': 'application/json'})
-    response = msg_rq.text
-
+async def post_msg(web_hook_url, payload):
+    msg_rq = await _CLIENT.post(url=web_hook_url, content=payload, headers=_JSON_HEADERS)
+    # Body is only decoded where the status says it is used
     if msg_rq.status_code == 200:
-        return response
+        return msg_rq.text
     elif  msg_rq.status_code == 429 or  msg_rq.status_code >= 500:
         # Retry
-        raise SendMsgError("{msg} - {status}".format(msg=response, status= msg_rq.status_code))
+        raise SendMsgError(f"{msg_rq.text} - {msg_rq.status_code}")
     else:
         # Fail with no retries
         msg_rq.raise_for_status()
-    return response
-
-
-# Test the webhook
-print("\nTesting Webhook")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = slack_cfg['slack_webhook']['channel']
-
-response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-print(response)
-
-# Force failure using a non-existing channel
-print("\nForce failure using a non-existing channel")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = "#NA"
-
-try:
-    response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-    print(response)
-except Exception as err:
-    print(str(err))
-
-
-# Run test mocking error 500
-print("\nForce failure erro 5XX mock")
-web_hook_url = slack_cfg['slack_mock5XX']
-web_hook_ch = "#NA"
-
-try:
-    response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-    print(response)
-except Exception as err:
-    print(str(err))
-
-# Run test mocking error 429
-print("\nForce failure erro 429 mock")
-web_hook_url = slack_cfg['slack_mock429']
-web_hook_ch = "#NA"
-
-try:
-    response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-    print(response)
-except Exception as err:
-    print(str(err))
\ No newline at end of file
+    return msg_rq.text
+
+
+def prepare_msg(channel, msg):
+    # Serialize once, retries only resend the bytes
+    return orjson.dumps({**msg, "channel": f"#{channel}"})
+
+
+async def send_msg_slack(web_hook_url, channel, msg):
+    return await post_msg(web_hook_url, prepare_msg(channel, msg))
+
+
+# Test cases: (title, webhook url, channel)
+test_cases = [
+    ("Testing Webhook", slack_cfg['slack_webhook']['url'], slack_cfg['slack_webhook']['channel']),
+    ("Force failure using a non-existing channel", slack_cfg['slack_webhook']['url'], "#NA"),
+    ("Force failure erro 5XX mock", slack_cfg['slack_mock5XX'], "#NA"),
+    ("Force failure erro 429 mock", slack_cfg['slack_mock429'], "#NA"),
+]
+
+
+async def main():
+    try:
+        # Send all the test cases at once, a retry backoff on one
+        # of them does not hold the others
+        results = await asyncio.gather(
+            *(send_msg_slack(web_hook_url, web_hook_ch, msg)
+              for _, web_hook_url, web_hook_ch in test_cases),
+            return_exceptions=True)
+    finally:
+        await _CLIENT.aclose()
+    for (title, _, _), response in zip(test_cases, results):
+        print("\n" + title)
+        print(str(response))
+
+
+asyncio.run(main())
@@ -1,35 +1,58 @@
-from datetime import datetime
+from __future__ import annotations
+
 from config import slack_cfg
-from tenacity import retry, stop_after_attempt, before_log, wait_exponential, retry_if_exception_type
-import time
-import requests
-import json
+from tenacity import retry, stop_after_attempt, before_sleep_log, wait_exponential, retry_if_exception_type, RetryError, RetryCallState
+import asyncio
+import httpx
+import orjson
 import sys
+import time
+from urllib.parse import urlparse
 
 import logging
 
 logging.basicConfig(format='%(asctime)s :: %(levelname)s :: %(message)s',
-                    stream=sys.stderr, level=logging.DEBUG)
+                    stream=sys.stderr, level=logging.INFO)
 logger = logging.getLogger(__name__)
+# httpx logs every request at INFO, keep only its warnings
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Connection pool sizing, shared by every request of a SlackPub client
+_POOL_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=16)
 
-def custom_wait(retry_state):
-    func_object = retry_state.args[0]               # Get the class object
-    func_name = retry_state.fn.__name__             # Get the retried function name
-    wait = func_object.wait.get(func_name, None)    # Get the wait time form the wait dict on the object
-    if wait is None:
-        # No wait time then default to the default retry policy
+# Shared headers, httpx copies them into each request
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Circuit breaker: consecutive failed sends before an URL is skipped, and for how long
+CIRCUIT_THRESHOLD = 3
+CIRCUIT_COOLDOWN = 30
+
+# Retry-After deadline per host, shared by every post to that host
+_RATE_LIMIT_UNTIL: dict[str, float] = dict()
+
+def custom_wait(retry_state: RetryCallState) -> float:
+    whook_url = retry_state.args[1]                 # Get the webhook URL (args[0] is the class object)
+    host = urlparse(whook_url).netloc               # Get the host the rate limit applies to
+    wait = _RATE_LIMIT_UNTIL.get(host, 0) - time.monotonic()
+    if wait <= 0:
+        # No Retry-After window then default to the default retry policy
         return default_wait(retry_state)
     else:
-        # Clean the wait time and retun the wait value
-        func_object.wait[func_name] = None
+        # Wait for what is left of the Retry-After window
         return wait
 
-def default_wait(retry_state):
-    return wait_exponential(multiplier=1, min=0, max=10)(retry_state)
+# Default retry policy, built once and shared by every retry decision
+_DEFAULT_WAIT = wait_exponential(multiplier=1, min=0, max=10)
+
+def default_wait(retry_state: RetryCallState) -> float:
+    return _DEFAULT_WAIT(retry_state)
     
 class SendMsgError(Exception):
     pass
 
+class CircuitOpenError(Exception):
+    pass
+
 ## Prepare the slack message
 msg = dict(
     icon_emoji=":smile:",
@@ -38,82 +61,94 @@ msg = dict(
 )
 
 # Slack messages posting code refactored as a class
+# One instance serves every webhook and channel, so the connection
+# pool and the per-URL state outlive any single message
 class SlackPub():
-    def __init__(self, whook_url, channel):
-        self.whook_url = whook_url
-        self.channel = channel
-        self.wait = dict()                  # A dict to store the wait times
-        self.wait['send_msg_slack'] = None
-
+    def __init__(self) -> None:
+        # Keep-alive HTTP/2 client, reused across retries and messages;
+        # concurrent posts to the same host share one connection
+        self._client = httpx.AsyncClient(http2=True, timeout=10, limits=_POOL_LIMITS)
+        self._failures: dict[str, int] = dict()         # Consecutive failed sends per URL
+        self._open_until: dict[str, float] = dict()     # Circuit open deadline per URL
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def prepare_msg(self, channel: str, msg: dict) -> bytes:
+        # Serialize once, retries only resend the bytes
+        return orjson.dumps({**msg, "channel": f"#{channel}"})
+
+    def _record_failure(self, url: str) -> None:
+        failures = self._failures.get(url, 0) + 1
+        self._failures[url] = failures
+        if failures >= CIRCUIT_THRESHOLD:
+            self._open_until[url] = time.monotonic() + CIRCUIT_COOLDOWN
+
+    async def send_msg_slack(self, whook_url: str, channel: str, msg: dict) -> str:
+        if time.monotonic() < self._open_until.get(whook_url, 0):
+            # Endpoint keeps failing, do not hit the network
+            raise CircuitOpenError(f"{whook_url}: circuit open")
+        try:
+            response = await self.post_msg(whook_url, self.prepare_msg(channel, msg))
+        except RetryError:
+            # Every attempt of this send failed
+            self._record_failure(whook_url)
+            raise
+        self._failures[whook_url] = 0
+        return response
 
-    @retry(stop=stop_after_attempt(4), before=before_log(logger, logging.DEBUG),
+    # tenacity detects the coroutine and waits with asyncio.sleep
+    @retry(stop=stop_after_attempt(4), before_sleep=before_sleep_log(logger, logging.INFO),
            wait=custom_wait,
            retry=retry_if_exception_type(SendMsgError))
-    def send_msg_slack(self, msg):
-        msg["channel"] = "#{channel}".format(channel=self.channel)
-        msg_rq = requests.post(url=self.whook_url, json=msg, headers={
-            'Content-Type': 'application/json'})
-        response = msg_rq.text
-
+    async def post_msg(self, whook_url: str, payload: bytes) -> str:
+        host = urlparse(whook_url).netloc
+        delay = _RATE_LIMIT_UNTIL.get(host, 0) - time.monotonic()
+        if delay > 0:
+            # Another send hit the host's rate limit, wait for its window to end
+            await asyncio.sleep(delay)
+        msg_rq = await self._client.post(url=whook_url, content=payload, headers=_JSON_HEADERS)
+        # Body is only decoded where the status says it is used
         if msg_rq.status_code == 200:
-            return response
+            return msg_rq.text
         elif msg_rq.status_code == 429:
             # Retry
             retry_after = msg_rq.headers.get("Retry-After", None)
             if retry_after is not None:
-                self.wait['send_msg_slack'] = int(retry_after)
-            raise SendMsgError("{msg} - {status}".format(msg=response, status= msg_rq.status_code))
+                _RATE_LIMIT_UNTIL[host] = time.monotonic() + int(retry_after)
+            raise SendMsgError(f"{msg_rq.text} - {msg_rq.status_code}")
         elif msg_rq.status_code >= 500:
             # Retry
-            raise SendMsgError("{msg} - {status}".format(msg=response, status= msg_rq.status_code))
+            raise SendMsgError(f"{msg_rq.text} - {msg_rq.status_code}")
         else:
             # Fail with no retries
             msg_rq.raise_for_status()
-        return response
-
-
-# Test the webhook
-print("\nTesting Webhook")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = slack_cfg['slack_webhook']['channel']
-slack_cli = SlackPub(web_hook_url, web_hook_ch)
-
-response = slack_cli.send_msg_slack(msg)
-print(response)
-
-# Force failure using a non-existing channel
-print("\nForce failure using a non-existing channel")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = "#NA"
-slack_cli = SlackPub(web_hook_url, web_hook_ch)
-
-try:
-    response = slack_cli.send_msg_slack(msg)
-    print(response)
-except Exception as err:
-    print(str(err))
-
-
-# Run test mocking error 500
-print("\nForce failure erro 5XX mock")
-web_hook_url = slack_cfg['slack_mock5XX']
-web_hook_ch = "#NA"
-slack_cli = SlackPub(web_hook_url, web_hook_ch)
-
-try:
-    response = slack_cli.send_msg_slack(msg)
-    print(response)
-except Exception as err:
-    print(str(err))
-
-# Run test mocking error 429
-print("\nForce failure erro 429 mock")
-web_hook_url = slack_cfg['slack_mock429']
-web_hook_ch = "#NA"
-slack_cli = SlackPub(web_hook_url, web_hook_ch)
-
-try:
-    response = slack_cli.send_msg_slack(msg)
-    print(response)
-except Exception as err:
-    print(str(err))
\ No newline at end of file
+        return msg_rq.text
+
+
+# Test cases: (title, webhook url, channel)
+test_cases: list[tuple[str, str, str]] = [
+    ("Testing Webhook", slack_cfg['slack_webhook']['url'], slack_cfg['slack_webhook']['channel']),
+    ("Force failure using a non-existing channel", slack_cfg['slack_webhook']['url'], "#NA"),
+    ("Force failure erro 5XX mock", slack_cfg['slack_mock5XX'], "#NA"),
+    ("Force failure erro 429 mock", slack_cfg['slack_mock429'], "#NA"),
+]
+
+
+async def main():
+    slack_cli = SlackPub()
+    try:
+        # Send all the test cases at once, a retry backoff on one
+        # of them does not hold the others
+        results = await asyncio.gather(
+            *(slack_cli.send_msg_slack(web_hook_url, web_hook_ch, msg)
+              for _, web_hook_url, web_hook_ch in test_cases),
+            return_exceptions=True)
+    finally:
+        await slack_cli.aclose()
+    for (title, _, _), response in zip(test_cases, results):
+        print("\n" + title)
+        print(str(response))
+
+
+asyncio.run(main())
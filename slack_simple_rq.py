@@ -1,8 +1,16 @@
 
-import json
-import requests
+import asyncio
+import httpx
+import orjson
 from config import slack_cfg
 
+# Shared HTTP/2 client, reused across calls;
+# concurrent posts share one connection
+_CLIENT = httpx.AsyncClient(http2=True, timeout=10)
+
+# Shared headers, httpx copies them into each request
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
 ## Prepare the slack message
 msg = dict(
     icon_emoji=":smile:",
@@ -10,42 +18,35 @@ msg = dict(
     text="This is a simple text"
 )
 
-def send_msg_slack(web_hook_url, channel, msg):
-    msg["channel"] = "#{channel}".format(channel=channel)
-    msg_rq = requests.post(url=web_hook_url, json=msg, headers={
-        'Content-Type': 'application/json'})
-    response = msg_rq.text
+async def send_msg_slack(web_hook_url, channel, msg):
+    payload = orjson.dumps({**msg, "channel": f"#{channel}"})
+    msg_rq = await _CLIENT.post(url=web_hook_url, content=payload, headers=_JSON_HEADERS)
     msg_rq.raise_for_status()
-    return response
-
-
-# Test the webhook
-print("\nTesting Webhook")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = slack_cfg['slack_webhook']['channel']
-
-response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-print(response)
-
-# Force failure using a non-existing channel
-print("\nForce failure using a non-existing channel")
-web_hook_url = slack_cfg['slack_webhook']['url']
-web_hook_ch = "#NA"
-
-try:
-    response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-    print(response)
-except Exception as err:
-    print(str(err))
-
-
-# Run test mocking error 500
-print("\nForce failure erro 5XX mock")
-web_hook_url = slack_cfg['slack_mock5XX']
-web_hook_ch = "#NA"
-
-try:
-    response = send_msg_slack(web_hook_url, web_hook_ch, msg)
-    print(response)
-except Exception as err:
-    print(str(err))
+    # Body is only decoded once the status says it is used
+    return msg_rq.text
+
+
+# Test cases: (title, webhook url, channel)
+test_cases = [
+    ("Testing Webhook", slack_cfg['slack_webhook']['url'], slack_cfg['slack_webhook']['channel']),
+    ("Force failure using a non-existing channel", slack_cfg['slack_webhook']['url'], "#NA"),
+    ("Force failure erro 5XX mock", slack_cfg['slack_mock5XX'], "#NA"),
+]
+
+
+async def main():
+    try:
+        # Send all the test cases at once, a retry backoff on one
+        # of them does not hold the others
+        results = await asyncio.gather(
+            *(send_msg_slack(web_hook_url, web_hook_ch, msg)
+              for _, web_hook_url, web_hook_ch in test_cases),
+            return_exceptions=True)
+    finally:
+        await _CLIENT.aclose()
+    for (title, _, _), response in zip(test_cases, results):
+        print("\n" + title)
+        print(str(response))
+
+
+asyncio.run(main())